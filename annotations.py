@@ -0,0 +1,156 @@
+"""
+Columnar export of the annotations in a tagged TEI document, so that corpus
+  statistics can be computed without re-parsing the TEI.
+"""
+
+import csv
+from array import array
+
+TEI_NS = "{http://www.tei-c.org/ns/1.0}"
+
+# annotation types, indexed by their integer code in the "type" column
+TYPES = ["said", "persName", "placeName"]
+
+# numeric columns, followed by the (string) name column
+INT_COLUMNS = ["block", "start", "end", "type", "div1", "div2", "div3"]
+COLUMNS = INT_COLUMNS + ["name"]
+
+
+def _section_number(elem, tag):
+    """The @n of the closest ancestor <tag/> of an element (0 if none)."""
+    for ancestor in elem.iterancestors(TEI_NS + tag):
+        return int(ancestor.get("n", 0))
+    return 0
+
+
+def extract_annotations(doc):
+    """
+    Extract <said/>, <persName/> and <placeName/> spans from a tagged TEI document
+      into columns.
+
+    Spans are located by "block" (the index of the enclosing <p/> or <head/> in
+      document order) and by start/end character offsets in that block's text.
+    Section numbers come from the @n attributes added by markup_sections
+      (0 where there is no enclosing section, or it isn't numbered).
+    """
+    columns = {key: array("l") for key in INT_COLUMNS}
+    columns["name"] = []
+    type_codes = {TEI_NS + tag: i for i, tag in enumerate(TYPES)}
+
+    def walk(elem, offset, block, sections):
+        # rows are added in document order, with the end offset filled in later
+        row = None
+        if elem.tag in type_codes:
+            code = type_codes[elem.tag]
+            row = len(columns["name"])
+            for key, value in zip(
+                INT_COLUMNS, (block, offset, offset, code) + sections
+            ):
+                columns[key].append(value)
+            columns["name"].append("".join(elem.itertext()) if code else "")
+        if elem.text:
+            offset += len(elem.text)
+        for sub_elem in elem:
+            offset = walk(sub_elem, offset, block, sections)
+            if sub_elem.tail:
+                offset += len(sub_elem.tail)
+        if row is not None:
+            columns["end"][row] = offset
+        return offset
+
+    text = doc.find(TEI_NS + "text")
+    blocks = text.iter(TEI_NS + "p", TEI_NS + "head") if text is not None else []
+    for block, elem in enumerate(blocks):
+        sections = tuple(_section_number(elem, tag) for tag in ["div1", "div2", "div3"])
+        offset = len(elem.text or "")
+        for sub_elem in elem:
+            offset = walk(sub_elem, offset, block, sections)
+            if sub_elem.tail:
+                offset += len(sub_elem.tail)
+
+    return columns
+
+
+def write_annotations(columns, path):
+    """Write annotation columns as CSV, or as NumPy arrays if path ends in .npz."""
+    path = str(path)
+    if path.endswith(".npz"):
+        np = _import_numpy()
+        arrays = {key: np.asarray(columns[key], dtype=np.int64) for key in INT_COLUMNS}
+        arrays["name"] = np.asarray(columns["name"], dtype=str)
+        np.savez_compressed(path, **arrays)
+        return
+
+    with open(path, "wt", encoding="utf8", newline="") as _fh:
+        writer = csv.writer(_fh)
+        writer.writerow(COLUMNS)
+        writer.writerows(zip(*(columns[key] for key in COLUMNS)))
+
+
+def read_annotations(path):
+    """Read annotation columns (as written by write_annotations) into NumPy arrays."""
+    np = _import_numpy()
+    path = str(path)
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {key: data[key] for key in COLUMNS}
+
+    with open(path, "rt", encoding="utf8", newline="") as _fh:
+        reader = csv.reader(_fh)
+        header = next(reader)
+        rows = list(zip(*reader)) or [()] * len(header)
+    columns = dict(zip(header, rows))
+    arrays = {key: np.asarray(columns[key], dtype=np.int64) for key in INT_COLUMNS}
+    arrays["name"] = np.asarray(columns["name"], dtype=str)
+    return arrays
+
+
+def section_aggregates(columns, annotation_type=None):
+    """
+    Per-section aggregates for a set of annotation columns.
+
+    Returns a dict of NumPy arrays: "sections" (one div1, div2, div3 row per
+      section containing annotations), "count" (number of spans) and "chars"
+      (total span length in characters).
+    """
+    np = _import_numpy()
+    columns = {key: np.asarray(value) for key, value in columns.items()}
+    if annotation_type is not None:
+        mask = columns["type"] == TYPES.index(annotation_type)
+        columns = {key: value[mask] for key, value in columns.items()}
+
+    keys = np.stack([columns["div1"], columns["div2"], columns["div3"]], axis=1)
+    keys = keys.astype(np.int64).reshape(-1, 3)
+    sections, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    lengths = (columns["end"] - columns["start"]).astype(np.int64)
+
+    return {
+        "sections": sections,
+        "count": np.bincount(inverse, minlength=len(sections)),
+        "chars": np.bincount(inverse, weights=lengths, minlength=len(sections)).astype(
+            np.int64
+        ),
+    }
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required for this (pip install numpy)")
+    return numpy
+
+
+if __name__ == "__main__":
+    # Print per-section aggregates for one or more annotation files.
+    import sys
+
+    for path in sys.argv[1:]:
+        columns = read_annotations(path)
+        for annotation_type in TYPES:
+            aggregates = section_aggregates(columns, annotation_type)
+            for section, count, chars in zip(
+                aggregates["sections"], aggregates["count"], aggregates["chars"]
+            ):
+                print(path, annotation_type, *section, count, chars, sep="\t")
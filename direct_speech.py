@@ -1,31 +1,32 @@
-import regex as re
+from functools import lru_cache
 
 ATTRIBS = ["aloud", "direct", "who", "toWhom"]
 
+# punctuation which can terminate an utterance (or part thereof)
+TERMINATING_PUNCTUATION = "?!).»"
 
-def markup_direct_speech(text: str) -> str:
-    """
-    Markup direct speech in the given text with <said/> tags.
-    See tests/test_direct_speech.py for examples.
-    """
-
-    # punctuation which can terminate an utterance (or part thereof)
-    p = "?!).»"
+# designate two unicode "noncharacters" for use as temporary markers
+START = "\ufffe"
+END = "\uffff"
 
-    # designate two unicode "noncharacters" for use as temporary markers
-    start = "\uFFFE"
-    end = "\uFFFF"
 
-    text_out = []
-    for line in text.splitlines():
-
-        # mark text inside bounding straight double quotes
-        line = re.sub(r'«?"[^"\n]+"', rf"{start}\g<0>{end}", line)
+@lru_cache(maxsize=None)
+def compile_patterns():
+    """
+    Compile the direct speech patterns, once, on first use.
+    (regex is imported here too, as it is comparatively slow to import.)
+    """
+    import regex as re
 
-        line_out = line
+    p = TERMINATING_PUNCTUATION
+    start = START
+    end = END
 
+    return {
+        # text inside bounding straight double quotes
+        "quoted": re.compile(r'«?"[^"\n]+"'),
         # first pass for direct speech offset by an emdash
-        line_out = re.sub(
+        "first_pass": re.compile(
             rf"""
             (?<!{start})          # onset is not already marked
             (?<!{end}\s)          # or follows immediately from a marked sequence
@@ -53,31 +54,17 @@ def markup_direct_speech(text: str) -> str:
             ))
             ([{p}])?              # capture any trailing terminating punctuation
             """,
-            lambda m: "".join(
-                [
-                    (m.group(1).strip() + " " if m.group(1) else m.group(3)),
-                    start,
-                    (m.group(2) or m.group(4)),
-                    m.group(5) or "",
-                    end,
-                ]
-            ),
-            line_out,
             flags=re.VERBOSE,
-        )
-
+        ),
+        # an utterance that has already been marked
+        "marked_guillemet": re.compile(rf"«{start}[^»]+{end}"),
+        "marked_guillemets": re.compile(rf"«{start}[^»]+»{end}"),
         # second pass for utterances offset with emdash and that resume after
         #  an inquit that terminates with a comma or a period
-        if (
-            # if there's already a marked utterance in this line
-            f"— {start}" in line_out
-            or re.search(rf"«{start}[^»]+{end}", line_out)
-            or re.match(rf"«{start}[^»]+»{end}", line_out)
-        ):
-            line_out = re.sub(
-                rf"""
+        "second_pass": re.compile(
+            rf"""
                                   # onset follows a marked utterance earlier in the line
-                (?<={end}[^{end}]+?) 
+                (?<={end}[^{end}]+?)
                 (?<!{end})        # onset does not immediately follow a marked utterance
 
                 ([,.])\s*         # capture a comma or period that terminates an inquit
@@ -91,9 +78,56 @@ def markup_direct_speech(text: str) -> str:
                 )
                 ([{p}]+)?         # capture any trailing terminating punctuation
                 """,
-                rf"\g<1> — {start}\g<2>\g<3>{end}",
-                line_out,
-                flags=re.VERBOSE,
+            flags=re.VERBOSE,
+        ),
+        # bounding guillemets
+        "guillemets": re.compile(rf"(?<!{start})«.+?(»(?!{end})|\n|$)"),
+    }
+
+
+def markup_direct_speech(text: str) -> str:
+    """
+    Markup direct speech in the given text with <said/> tags.
+    See tests/test_direct_speech.py for examples.
+    """
+
+    patterns = compile_patterns()
+    start = START
+    end = END
+    said = "<said {}>".format(" ".join(f'{k}=""' for k in ATTRIBS))
+
+    def mark_first_pass(m):
+        return "".join(
+            [
+                (m.group(1).strip() + " " if m.group(1) else m.group(3)),
+                start,
+                (m.group(2) or m.group(4)),
+                m.group(5) or "",
+                end,
+            ]
+        )
+
+    text_out = []
+    for line in text.splitlines():
+
+        # mark text inside bounding straight double quotes
+        line = patterns["quoted"].sub(rf"{start}\g<0>{end}", line)
+
+        line_out = line
+
+        # first pass for direct speech offset by an emdash
+        line_out = patterns["first_pass"].sub(mark_first_pass, line_out)
+
+        # second pass for utterances offset with emdash and that resume after
+        #  an inquit that terminates with a comma or a period
+        if (
+            # if there's already a marked utterance in this line
+            f"— {start}" in line_out
+            or patterns["marked_guillemet"].search(line_out)
+            or patterns["marked_guillemets"].match(line_out)
+        ):
+            line_out = patterns["second_pass"].sub(
+                rf"\g<1> — {start}\g<2>\g<3>{end}", line_out
             )
 
         # post-hoc
@@ -101,16 +135,10 @@ def markup_direct_speech(text: str) -> str:
         line_out = line_out.replace(f"».{end}", f"»{end}.")
 
         # replace bounding guillemets with <said> tags
-        line_out = re.sub(
-            rf"(?<!{start})«.+?(»(?!{end})|\n|$)",
-            rf"{start}\g<0>{end}",
-            line_out,
-        )
+        line_out = patterns["guillemets"].sub(rf"{start}\g<0>{end}", line_out)
 
         # replace temporary markers with <said> tags
-        line_out = line_out.replace(
-            start, "<said {}>".format(" ".join(f'{k}=""' for k in ATTRIBS))
-        )
+        line_out = line_out.replace(start, said)
         line_out = line_out.replace(end, "</said>")
 
         text_out.append(line_out)
@@ -6,16 +6,17 @@ CLI for parsing raw text files from the corpus of the Digital Dostoevsky Project
 """
 
 import argparse
+import hashlib
+import json
 import logging
 import sys
+import time
 from pathlib import Path
 
-from lxml import etree
-
-from direct_speech import markup_direct_speech
-from proper_names import markup_proper_names
-from parse_sections import parse_sections, markup_sections
+# Note: to keep startup fast, lxml and the tagging modules are imported when they
+#  are first needed, rather than here (see tests/test_startup.py)
 
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
 
 XML_PROCESSING_INSTRUCTIONS = [
     '<?xml version="1.0" encoding="UTF-8"?>',
@@ -77,6 +78,303 @@ def format_tree(elem, indent="  ", level=0):
             elem.tail = i
 
 
+def compact_tree(elem):
+    """Strips indentation whitespace from a tree, leaving mixed content intact."""
+    if elem.tag == "{http://www.tei-c.org/ns/1.0}p":
+        return
+    if elem.tag == "{http://www.tei-c.org/ns/1.0}head":
+        return
+    if elem.text and not elem.text.strip():
+        elem.text = None
+    for sub_elem in elem:
+        compact_tree(sub_elem)
+        if sub_elem.tail and not sub_elem.tail.strip():
+            sub_elem.tail = None
+
+
+def compression_for_path(path):
+    """Infer the output compression from a file name's suffix (or None)."""
+    return COMPRESSION_SUFFIXES.get(Path(path).suffix.lower())
+
+
+def get_compressor(compression=None):
+    """
+    Return a callable that wraps a binary file handle in a compressing stream
+    (or None, if no compression was requested).
+    Output is reproducible: the same input always compresses to the same bytes.
+    """
+    if compression is None or compression == "none":
+        return None
+    if compression == "gzip":
+        import gzip
+
+        # no timestamp or file name in the header, so output hashes are stable
+        return lambda fh: gzip.GzipFile(filename="", fileobj=fh, mode="wb", mtime=0)
+    if compression == "bz2":
+        import bz2
+
+        return lambda fh: bz2.BZ2File(fh, mode="wb")
+    if compression == "xz":
+        import lzma
+
+        return lambda fh: lzma.LZMAFile(fh, mode="wb")
+    if compression == "zstd":
+        try:
+            # only in the standard library from Python 3.14
+            from compression import zstd
+        except ImportError:
+            raise ValueError("zstd compression requires Python >= 3.14")
+
+        return lambda fh: zstd.ZstdFile(fh, mode="wb")
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def write_tei(doc, fh, compact=False):
+    """
+    Write a TEI document (with processing instructions) to a binary file handle.
+    The tree is serialised straight to the handle, without an intermediate string.
+    """
+    if compact:
+        compact_tree(doc)
+    else:
+        format_tree(doc)
+    from lxml import etree
+
+    fh.write(("\n".join(XML_PROCESSING_INSTRUCTIONS) + "\n").encode("utf8"))
+    etree.ElementTree(doc).write(fh, encoding="UTF-8", pretty_print=not compact)
+
+
+class HashingWriter:
+    """A binary file wrapper that keeps a SHA-256 digest of everything written."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.hash = hashlib.sha256()
+
+    def write(self, data):
+        self.hash.update(data)
+        return self.fh.write(data)
+
+    def flush(self):
+        self.fh.flush()
+
+
+def read_names_list(path):
+    """Read a line-by-line list of names."""
+    with Path(path).open("rt", encoding="utf8") as _fh:
+        return [line.strip() for line in _fh if line.strip()]
+
+
+def load_relaxng(path):
+    """Load a RELAX NG schema."""
+    from lxml import etree
+
+    logging.info("Loading schema: {}".format(path))
+    return etree.RelaxNG(etree.parse(path))
+
+
+def tag_text(text, person_names=None, place_names=None):
+    """Apply direct speech, proper name and structural markup to a raw text."""
+
+    from lxml import etree
+
+    from direct_speech import markup_direct_speech
+    from parse_sections import parse_sections, markup_sections
+
+    text = markup_direct_speech(text)
+
+    if person_names or place_names:
+        from proper_names import markup_proper_names
+
+    if person_names:
+        text = markup_proper_names(text, person_names, "persName")
+
+    if place_names:
+        text = markup_proper_names(text, place_names, "placeName")
+
+    sections = parse_sections(text)
+    text = markup_sections(sections)
+
+    return etree.fromstring(create_tei_structure(text).encode("utf8"))
+
+
+def validate_tei(doc, relaxng):
+    """
+    Validate a TEI document against a RELAX NG schema.
+    Returns the number of unexpected validation errors (each is logged).
+    """
+    if relaxng.validate(doc):
+        return 0
+
+    errors = 0
+    for entry in relaxng.error_log:
+        # Note: better validation errors are available with something like jing
+        if (
+            entry.message == "Invalid attribute aloud for element said"
+            or entry.line in [15, 16]
+        ):
+            # these errors are expected, given that dummy values are used
+            # -- only report if debug logging is enabled
+            logging.debug(entry)
+        else:
+            logging.warning(entry)
+            errors += 1
+    return errors
+
+
+def process_file(
+    input_path,
+    output_path=None,
+    annotations_path=None,
+    compressor=None,
+    compact=False,
+    person_names=None,
+    place_names=None,
+    relaxng=None,
+):
+    """
+    Tag a single raw text file, writing TEI to output_path (default: stdout).
+    Returns a result record for the run manifest.
+    """
+
+    started = time.perf_counter()
+    logging.info("Processing input text: %s", input_path)
+
+    with Path(input_path).open("r", encoding="utf8") as _fh:
+        text = _fh.read()
+
+    doc = tag_text(text, person_names, place_names)
+
+    if annotations_path:
+        from annotations import extract_annotations, write_annotations
+
+        logging.info("Writing annotations to: %s", annotations_path)
+        Path(annotations_path).parent.mkdir(parents=True, exist_ok=True)
+        write_annotations(extract_annotations(doc), annotations_path)
+
+    if output_path:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    logging.info("Writing processed text to: %s", output_path or "stdout")
+
+    with output_path.open("wb") if output_path else sys.stdout.buffer as _fh:
+        out_fh = HashingWriter(_fh)
+        if compressor is not None:
+            with compressor(out_fh) as _cfh:
+                write_tei(doc, _cfh, compact=compact)
+        else:
+            write_tei(doc, out_fh, compact=compact)
+
+    validation_errors = None
+    if relaxng is not None:
+        logging.info("Validating against schema")
+        validation_errors = validate_tei(doc, relaxng)
+
+    return {
+        "input": str(input_path),
+        "output": str(output_path) if output_path else None,
+        "sha256": out_fh.hash.hexdigest(),
+        "validation_errors": validation_errors,
+        "seconds": time.perf_counter() - started,
+        "error": None,
+    }
+
+
+def check_templates(parser, args, inputs):
+    """Check that output paths can be templated for several inputs."""
+    for option, value in [
+        ("--output", args.output),
+        ("--annotations", args.annotations),
+    ]:
+        if value is not None and "{stem}" not in value:
+            parser.error(f"{option} must contain {{stem}} with several inputs")
+    if args.output is None:
+        parser.error("--output is required with several inputs")
+    check_unique_stems(parser, inputs)
+
+
+def check_unique_stems(parser, paths):
+    """Check that no two inputs would be written to the same templated output."""
+    stems = [Path(path).stem for path in paths]
+    if len(set(stems)) != len(stems):
+        parser.error("Input file names must be unique")
+
+
+def check_watch(parser, args):
+    """Check that options are compatible with watch mode."""
+    if args.shard or args.manifest:
+        parser.error("--watch cannot be combined with --shard or --manifest")
+    for option, value in [
+        ("--output", args.output),
+        ("--annotations", args.annotations),
+    ]:
+        if value is not None and "{stem}" not in value:
+            parser.error(f"--watch requires {option} containing {{stem}}")
+    if args.output is None:
+        parser.error("--watch requires --output containing {stem}")
+
+
+def check_outputs(parser, args, inputs, shard):
+    """
+    Check the output options, returning whether output paths are templates
+    (as they are with several inputs, a shard of them, or in watch mode).
+    """
+    if args.watch:
+        check_watch(parser, args)
+        return True
+    if len(inputs) > 1 or shard is not None:
+        check_templates(parser, args, inputs)
+        return True
+    return False
+
+
+def write_manifest(path, manifest):
+    """Write a run manifest as JSON."""
+    logging.info("Writing manifest to: %s", path)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with Path(path).open("wt", encoding="utf8") as _fh:
+        json.dump(manifest, _fh, indent=2, ensure_ascii=False)
+        _fh.write("\n")
+
+
+def watch(watcher, run):
+    """Re-tag watched files whenever they change, until interrupted."""
+    logging.info("Watching %d files for changes", len(watcher.known))
+    # the file each output stem belongs to, so new files can't overwrite its output
+    owners = {Path(path).stem: path for path in watcher.known}
+    try:
+        for changed in watcher:
+            for input_path in changed:
+                owner = owners.setdefault(Path(input_path).stem, input_path)
+                if owner != input_path and owner in watcher.known:
+                    logging.warning(
+                        "Not tagging %s, as its output would overwrite that of %s",
+                        input_path,
+                        owner,
+                    )
+                    continue
+                owners[Path(input_path).stem] = input_path
+                result = run(input_path)
+                if result["error"]:
+                    continue
+                logging.info(
+                    "Tagged %s -> %s in %.2fs%s",
+                    input_path,
+                    result["output"],
+                    result["seconds"],
+                    " (valid)" if result["validation_errors"] == 0 else "",
+                )
+                if result["validation_errors"]:
+                    logging.warning(
+                        "%s has %d validation errors",
+                        result["output"],
+                        result["validation_errors"],
+                    )
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
     """Command-line entry-point."""
 
@@ -91,7 +389,27 @@ def main():
         "-o",
         "--output",
         action="store",
-        help="Output file (default: stdout)",
+        help=(
+            "Output file (default: stdout); "
+            "must contain {stem} when processing more than one input"
+        ),
+    )
+    parser.add_argument(
+        "--compression",
+        action="store",
+        choices=["none"] + sorted(set(COMPRESSION_SUFFIXES.values())),
+        help="Compress output (default: inferred from the output file suffix)",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        default=False,
+        help="Write compact, non-indented XML",
+    )
+    parser.add_argument(
+        "--annotations",
+        action="store",
+        help="Columnar annotations file to write, as CSV or .npz (optional)",
     )
     parser.add_argument(
         "--rng-schema",
@@ -108,10 +426,62 @@ def main():
         action="store",
         help="Line-by-line list of place names (optional)",
     )
-    parser.add_argument("input_text", action="store", help="Text to process")
+    parser.add_argument(
+        "--shard",
+        action="store",
+        help="Only process shard i of N (given as i/N) of the inputs (optional)",
+    )
+    parser.add_argument(
+        "--shard-by",
+        action="store",
+        choices=["size", "lines"],
+        default="size",
+        help="How to balance inputs across shards (default: size)",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store",
+        help="Result manifest file to write, as JSON (optional)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        default=False,
+        help="Watch the input directories (or files), re-tagging files as they change",
+    )
+    parser.add_argument(
+        "--watch-pattern",
+        action="store",
+        default="*.txt",
+        help="Files to watch in input directories (default: *.txt)",
+    )
+    parser.add_argument(
+        "--debounce",
+        action="store",
+        type=float,
+        default=0.2,
+        help="Seconds a watched file must be unchanged before re-tagging (default: 0.2)",
+    )
+    parser.add_argument("input_text", nargs="+", help="Text(s) to process")
 
     args = parser.parse_args()
 
+    compression = args.compression
+    if compression is None and args.output:
+        compression = compression_for_path(args.output)
+    try:
+        compressor = get_compressor(compression)
+        shard = None
+        if args.shard:
+            from shards import parse_shard
+
+            shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+
+    inputs = sorted(set(args.input_text))
+    templated = check_outputs(parser, args, inputs, shard)
+
     log_level = logging.DEBUG if args.verbose else logging.INFO
     log_level = logging.CRITICAL if args.quiet else log_level
     logging.basicConfig(
@@ -120,55 +490,86 @@ def main():
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    logging.info("Processing input text: %s", args.input_text)
+    started = time.perf_counter()
 
-    with Path(args.input_text).open("r", encoding="utf8") as _fh:
-        text = _fh.read()
+    selected = inputs
+    if shard is not None:
+        from shards import assign_shards
 
-    text = markup_direct_speech(text)
+        selected = assign_shards(inputs, shard[1], args.shard_by)[shard[0] - 1]
+        logging.info(
+            "Processing shard %d/%d: %d of %d inputs",
+            *shard,
+            len(selected),
+            len(inputs),
+        )
 
+    person_names = None
     if args.person_names_list:
-        with Path(args.person_names_list).open("rt", encoding="utf8") as _fh:
-            person_names = [line.strip() for line in _fh if line.strip()]
-        text = markup_proper_names(text, person_names, "persName")
+        person_names = read_names_list(args.person_names_list)
 
+    place_names = None
     if args.place_names_list:
-        with Path(args.place_names_list).open("rt", encoding="utf8") as _fh:
-            place_names = [line.strip() for line in _fh if line.strip()]
-        text = markup_proper_names(text, place_names, "placeName")
+        place_names = read_names_list(args.place_names_list)
 
-    sections = parse_sections(text)
-    text = markup_sections(sections)
+    relaxng = load_relaxng(args.rng_schema) if args.rng_schema else None
 
-    if args.output:
-        output_path = Path(args.output)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    def template(path, input_path):
+        # {stem} is expanded even with a single input, e.g. when a glob matched one
+        if path is None:
+            return path
+        return path.replace("{stem}", Path(input_path).stem)
+
+    def run(input_path):
+        file_started = time.perf_counter()
+        output_path = template(args.output, input_path)
+        try:
+            return process_file(
+                input_path,
+                output_path=output_path,
+                annotations_path=template(args.annotations, input_path),
+                compressor=compressor,
+                compact=args.compact,
+                person_names=person_names,
+                place_names=place_names,
+                relaxng=relaxng,
+            )
+        except Exception as e:
+            if not templated and not args.manifest:
+                raise
+            logging.exception("Failed to process %s", input_path)
+            # same shape as process_file's result records
+            return {
+                "input": str(input_path),
+                "output": output_path,
+                "sha256": None,
+                "validation_errors": None,
+                "seconds": time.perf_counter() - file_started,
+                "error": f"{type(e).__name__}: {e}",
+            }
+
+    if args.watch:
+        from watch import Watcher
+
+        watcher = Watcher(inputs, args.watch_pattern, debounce=args.debounce)
+        check_unique_stems(parser, watcher.known)
+        watch(watcher, run)
+        return
+
+    results = [run(input_path) for input_path in selected]
+
+    if args.manifest:
+        manifest = {
+            "shard": list(shard) if shard else None,
+            "shard_by": args.shard_by,
+            "inputs": inputs,
+            "results": results,
+            "seconds": time.perf_counter() - started,
+        }
+        write_manifest(args.manifest, manifest)
 
-    doc = etree.fromstring(create_tei_structure(text).encode("utf8"))
-    format_tree(doc)
-
-    logging.info("Writing processed text to: %s", args.output or "stdout")
-
-    with output_path.open("wt", encoding="utf8") if args.output else sys.stdout as _fh:
-        _fh.write("\n".join(XML_PROCESSING_INSTRUCTIONS) + "\n")
-        _fh.write(etree.tostring(doc, pretty_print=True, encoding="unicode"))
-
-    if args.rng_schema:
-        logging.info("Validating against schema: {}".format(args.rng_schema))
-        relaxng_doc = etree.parse(args.rng_schema)
-        relaxng = etree.RelaxNG(relaxng_doc)
-        if not relaxng.validate(doc):
-            for entry in relaxng.error_log:
-                # Note: better validation errors are available with something like jing
-                if (
-                    entry.message == "Invalid attribute aloud for element said"
-                    or entry.line in [15, 16]
-                ):
-                    # these errors are expected, given that dummy values are used
-                    # -- only report if debug logging is enabled
-                    logging.debug(entry)
-                else:
-                    logging.warning(entry)
+    if any(result["error"] for result in results):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
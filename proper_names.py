@@ -1,11 +1,16 @@
 import re
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def compile_proper_names(names):
+    """Compile (and cache) the pattern for a tuple of names."""
+    return re.compile(rf"\b(?:{'|'.join(sorted(names, key=len, reverse=True))})\b")
 
 
 def markup_proper_names(text, names, tag):
 
-    re_proper_names = re.compile(
-        rf"\b(?:{'|'.join(sorted(names, key=len, reverse=True))})\b"
-    )
+    re_proper_names = compile_proper_names(tuple(names))
     text = re_proper_names.sub(rf"<{tag}>\g<0></{tag}>", text)
 
     return text
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Size-balanced sharding of corpus runs across several machines, and merging of
+  the per-shard result manifests written by parse_file.py.
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import sys
+from pathlib import Path
+
+
+def parse_shard(spec):
+    """Parse an "i/N" shard specification (1 <= i <= N) into a tuple."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must be given as i/N, not {spec!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, not {index}")
+    return index, count
+
+
+def file_weight(path, weigh_by="size"):
+    """
+    The amount of work a file represents, measured in bytes or lines.
+    Files that can't be read weigh nothing, so they are still assigned to a shard
+      (and reported as failures when it runs).
+    """
+    if weigh_by not in ["size", "lines"]:
+        raise ValueError(f"Unknown shard weighting: {weigh_by}")
+    try:
+        if weigh_by == "size":
+            return Path(path).stat().st_size
+        with Path(path).open("rb") as _fh:
+            return sum(
+                chunk.count(b"\n") for chunk in iter(lambda: _fh.read(1 << 20), b"")
+            )
+    except OSError:
+        return 0
+
+
+def assign_shards(paths, count, weigh_by="size"):
+    """
+    Greedily bin-pack paths into shards of similar total weight.
+
+    Files are taken heaviest first and each is added to the currently lightest
+      shard, so every node that runs this over the same list of paths computes
+      the same assignment.
+    """
+    weights = {path: file_weight(path, weigh_by) for path in paths}
+    shards = [[] for _ in range(count)]
+    heap = [(0, i) for i in range(count)]
+    for path in sorted(weights, key=lambda path: (-weights[path], path)):
+        total, i = heapq.heappop(heap)
+        shards[i].append(path)
+        heapq.heappush(heap, (total + weights[path], i))
+    return [sorted(shard) for shard in shards]
+
+
+def merge_manifests(manifests):
+    """
+    Combine per-shard manifests, checking that every input was processed exactly
+      once and without errors.
+    Returns the merged manifest, with any problems listed under "problems".
+    """
+    problems = []
+    inputs = None
+    shard_count = None
+    shards_seen = {}
+    results = {}
+
+    for manifest in manifests:
+        shard = tuple(manifest["shard"]) if manifest.get("shard") else (1, 1)
+        if shard_count is None:
+            shard_count = shard[1]
+        elif shard[1] != shard_count:
+            problems.append(f"Manifests disagree on shard count ({shard_count=})")
+        if shard in shards_seen:
+            problems.append(f"Shard {shard[0]}/{shard[1]} appears more than once")
+        shards_seen[shard] = manifest.get("seconds")
+
+        if inputs is None:
+            inputs = manifest["inputs"]
+        elif manifest["inputs"] != inputs:
+            problems.append(
+                f"Shard {shard[0]}/{shard[1]} was run over a different list of inputs"
+            )
+
+        for result in manifest["results"]:
+            results.setdefault(result["input"], []).append(result)
+
+    for index in range(1, (shard_count or 0) + 1):
+        if (index, shard_count) not in shards_seen:
+            problems.append(f"Shard {index}/{shard_count} is missing")
+
+    for path in inputs or []:
+        if path not in results:
+            problems.append(f"{path} was not processed")
+    for path, path_results in results.items():
+        if inputs is not None and path not in inputs:
+            problems.append(f"{path} was processed but is not a known input")
+        if len(path_results) > 1:
+            problems.append(f"{path} was processed {len(path_results)} times")
+        for result in path_results:
+            if result.get("error"):
+                problems.append(f"{path} failed: {result['error']}")
+
+    return {
+        "shards": [
+            {"shard": list(shard), "seconds": seconds}
+            for shard, seconds in sorted(shards_seen.items())
+        ],
+        "inputs": inputs or [],
+        "results": [result for path in sorted(results) for result in results[path]],
+        "problems": problems,
+    }
+
+
+def main():
+    """Command-line entry-point."""
+
+    parser = argparse.ArgumentParser(description="Description: {}".format(__doc__))
+    parser.add_argument(
+        "-q", "--quiet", action="store_true", default=False, help="Quiet operation"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser(
+        "merge-manifests", help="Combine and check per-shard result manifests"
+    )
+    merge_parser.add_argument(
+        "-o",
+        "--output",
+        action="store",
+        help="Merged manifest file (default: stdout)",
+    )
+    merge_parser.add_argument("manifests", nargs="+", help="Per-shard manifests")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.CRITICAL if args.quiet else logging.INFO,
+        format="%(asctime)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+
+    manifests = []
+    for path in args.manifests:
+        with Path(path).open("rt", encoding="utf8") as _fh:
+            manifests.append(json.load(_fh))
+
+    merged = merge_manifests(manifests)
+    for problem in merged["problems"]:
+        logging.warning(problem)
+    logging.info(
+        "Merged %d manifests covering %d inputs (%d problems)",
+        len(manifests),
+        len(merged["inputs"]),
+        len(merged["problems"]),
+    )
+
+    output = (
+        Path(args.output).open("wt", encoding="utf8") if args.output else sys.stdout
+    )
+    with output as _fh:
+        json.dump(merged, _fh, indent=2, ensure_ascii=False)
+        _fh.write("\n")
+
+    if merged["problems"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
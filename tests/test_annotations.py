@@ -0,0 +1,42 @@
+import pytest
+from lxml import etree
+
+from tagger.annotations import (
+    extract_annotations,
+    read_annotations,
+    section_aggregates,
+    write_annotations,
+)
+
+doc = etree.fromstring("""\
+<TEI xmlns="http://www.tei-c.org/ns/1.0"><text><body>
+<div1 type="part" n="1"><head>Часть первая</head><div2 type="chapter" n="2">
+<div3 type="section" n="3"><head>III</head>
+<p>— <said>Вы меня знаете?</said> — спросил <persName>Макар</persName>.</p>
+<p>«<said>В <placeName>Петербурге</placeName>?</said>»</p>
+</div3></div2></div1>
+</body></text></TEI>""".encode("utf8"))
+
+
+def test_extract_annotations():
+    columns = extract_annotations(doc)
+    assert list(columns["block"]) == [2, 2, 3, 3]
+    assert list(columns["start"]) == [2, 28, 1, 3]
+    assert list(columns["end"]) == [17, 33, 14, 13]
+    assert list(columns["type"]) == [0, 1, 0, 2]
+    assert columns["name"] == ["", "Макар", "", "Петербурге"]
+    assert {(1, 2, 3)} == set(zip(columns["div1"], columns["div2"], columns["div3"]))
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".npz"])
+def test_section_aggregates(tmp_path, suffix):
+    pytest.importorskip("numpy")
+    path = tmp_path / f"annotations{suffix}"
+    write_annotations(extract_annotations(doc), path)
+    columns = read_annotations(path)
+    assert list(columns["name"]) == ["", "Макар", "", "Петербурге"]
+
+    aggregates = section_aggregates(columns, "said")
+    assert aggregates["sections"].tolist() == [[1, 2, 3]]
+    assert aggregates["count"].tolist() == [2]
+    assert aggregates["chars"].tolist() == [15 + 13]
@@ -0,0 +1,96 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+
+import pytest
+from lxml import etree
+
+from tagger.parse_file import (
+    XML_PROCESSING_INSTRUCTIONS,
+    compression_for_path,
+    get_compressor,
+    write_tei,
+)
+
+TEI = """\
+<TEI xmlns="http://www.tei-c.org/ns/1.0">
+  <text>
+    <body>
+      <head type="mainTitle">Бедные люди</head>
+      <div1 type="part" n="1">
+        <div3 type="section" n="1">
+          <head>I</head>
+          <p>— <said>Вы меня знаете?</said> <persName>Макар</persName> </p>
+        </div3>
+      </div1>
+    </body>
+  </text>
+</TEI>"""
+
+P = "{http://www.tei-c.org/ns/1.0}p"
+HEAD = "{http://www.tei-c.org/ns/1.0}head"
+
+
+def written(compact=False, compression=None):
+    fh = io.BytesIO()
+    doc = etree.fromstring(TEI.encode("utf8"))
+    compressor = get_compressor(compression)
+    if compressor is None:
+        write_tei(doc, fh, compact=compact)
+    else:
+        with compressor(fh) as _cfh:
+            write_tei(doc, _cfh, compact=compact)
+    return fh.getvalue()
+
+
+@pytest.mark.parametrize(
+    "compression,decompress",
+    [("gzip", gzip.decompress), ("bz2", bz2.decompress), ("xz", lzma.decompress)],
+)
+def test_compression(compression, decompress):
+    assert decompress(written(compression=compression)) == written()
+    # no timestamps, so the same document always compresses to the same bytes
+    assert written(compression=compression) == written(compression=compression)
+
+
+def test_compression_for_path():
+    assert compression_for_path("out/story.xml.gz") == "gzip"
+    assert compression_for_path("out/story.xml.XZ") == "xz"
+    assert compression_for_path("out/story.xml") is None
+
+
+def test_unknown_compression():
+    assert get_compressor("none") is None
+    with pytest.raises(ValueError):
+        get_compressor("lz4")
+
+
+@pytest.mark.skipif(sys.version_info >= (3, 14), reason="zstd is in the stdlib")
+def test_zstd_unavailable():
+    with pytest.raises(ValueError):
+        get_compressor("zstd")
+
+
+def test_compact():
+    output = written(compact=True)
+    header = ("\n".join(XML_PROCESSING_INSTRUCTIONS) + "\n").encode("utf8")
+    assert output.startswith(header)
+
+    doc = etree.fromstring(output.replace(header, b"", 1))
+    expected = etree.fromstring(TEI.encode("utf8"))
+    assert [elem.tag for elem in doc.iter()] == [elem.tag for elem in expected.iter()]
+
+    for elem, expected_elem in zip(doc.iter(), expected.iter()):
+        parent = elem.getparent()
+        in_mixed_content = parent is not None and parent.tag in [P, HEAD]
+        # mixed content is left untouched, whitespace elsewhere is removed
+        if elem.tag in [P, HEAD] or in_mixed_content:
+            assert elem.text == expected_elem.text
+        else:
+            assert elem.text is None or elem.text.strip()
+        if in_mixed_content:
+            assert elem.tail == expected_elem.tail
+        elif parent is not None:
+            assert elem.tail is None
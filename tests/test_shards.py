@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from tagger.shards import assign_shards, merge_manifests, parse_shard
+
+
+def test_parse_shard():
+    assert parse_shard("2/3") == (2, 3)
+    for spec in ["0/3", "4/3", "3", "a/b"]:
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_assign_shards(tmp_path):
+    sizes = {"novel": 5000, "a": 1000, "b": 1500, "c": 2000, "d": 500, "e": 2500}
+    for name, size in sizes.items():
+        (tmp_path / f"{name}.txt").write_text("x" * size)
+    paths = sorted(str(tmp_path / f"{name}.txt") for name in sizes)
+
+    shards = assign_shards(paths, 2)
+    assert sorted(path for shard in shards for path in shard) == paths
+    totals = [sum(sizes[Path(path).stem] for path in shard) for shard in shards]
+    assert sorted(totals) == [6000, 6500]
+    assert assign_shards(list(reversed(paths)), 2) == shards
+
+
+@pytest.mark.parametrize("weigh_by", ["size", "lines"])
+def test_assign_shards_missing_file(tmp_path, weigh_by):
+    (tmp_path / "a.txt").write_text("x\n" * 10)
+    paths = [str(tmp_path / "a.txt"), str(tmp_path / "missing.txt")]
+
+    # a missing file is still assigned, so its shard can record the failure
+    shards = assign_shards(paths, 2, weigh_by)
+    assert sorted(path for shard in shards for path in shard) == paths
+
+
+def test_merge_manifests():
+    inputs = ["a.txt", "b.txt", "c.txt"]
+    manifests = [
+        {
+            "shard": [1, 2],
+            "inputs": inputs,
+            "results": [{"input": "a.txt", "error": None}],
+        },
+        {
+            "shard": [2, 2],
+            "inputs": inputs,
+            "results": [
+                {"input": "b.txt", "error": None},
+                {"input": "c.txt", "error": None},
+            ],
+        },
+    ]
+    merged = merge_manifests(manifests)
+    assert merged["problems"] == []
+    assert [result["input"] for result in merged["results"]] == inputs
+
+    manifests[1]["results"] = [
+        {"input": "a.txt", "error": None},
+        {"input": "b.txt", "error": "UnicodeDecodeError"},
+    ]
+    assert merge_manifests(manifests)["problems"] == [
+        "c.txt was not processed",
+        "a.txt was processed 2 times",
+        "b.txt failed: UnicodeDecodeError",
+    ]
+    assert merge_manifests(manifests[:1])["problems"][0] == "Shard 2/2 is missing"
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# stdlib modules the CLI can't do without, whose import time (measured in the
+#  same process) is the baseline the import time budget is relative to
+BASELINE_MODULES = ["argparse", "logging", "pathlib"]
+
+# budget for the CLI module's cumulative import time, as a multiple of the
+#  baseline -- about 1.5x when this was written, against about 2.5x when lxml and
+#  regex were imported eagerly, so this sits midway between the two
+IMPORT_TIME_BUDGET = 2.0
+
+# modules that should only be imported once a stage that needs them first runs
+DEFERRED_MODULES = [
+    "lxml.etree",
+    "regex",
+    "direct_speech",
+    "proper_names",
+    "parse_sections",
+    "annotations",
+    "shards",
+    "watch",
+]
+
+
+def import_times(module):
+    """Cumulative import times (in microseconds), as reported by -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.split(":", 1)[1].split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_deferred_imports():
+    times = import_times("parse_file")
+    assert [module for module in DEFERRED_MODULES if module in times] == []
+
+
+def test_import_time_budget():
+    # best of a few runs, to smooth out noise
+    ratios = []
+    for _ in range(3):
+        times = import_times("parse_file")
+        # baseline modules may already have been imported at interpreter startup
+        #  (e.g. by .pth files), in which case they aren't in the report
+        if not all(module in times for module in BASELINE_MODULES):
+            pytest.skip("baseline modules are imported at interpreter startup")
+        baseline = sum(times[module] for module in BASELINE_MODULES)
+        ratios.append(times["parse_file"] / baseline)
+    assert min(ratios) < IMPORT_TIME_BUDGET
+
+
+if __name__ == "__main__":
+    # Print the slowest imports, to see where startup time goes.
+    times = import_times(sys.argv[1] if len(sys.argv) > 1 else "parse_file")
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:20]:
+        print(f"{cumulative:>10} us  {name}")
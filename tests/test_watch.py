@@ -0,0 +1,30 @@
+import os
+
+from tagger.watch import Watcher
+
+
+def touch(path, text, mtime_ns):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_watcher(tmp_path):
+    touch(tmp_path / "a.txt", "a", 1_000_000_000)
+    touch(tmp_path / "b.md", "b", 1_000_000_000)
+    watcher = Watcher([tmp_path], debounce=0.2)
+    assert list(watcher.known) == [str(tmp_path / "a.txt")]
+    assert watcher.poll(now=10) == []
+
+    # a burst of saves is only reported once the file settles down
+    touch(tmp_path / "a.txt", "aa", 2_000_000_000)
+    touch(tmp_path / "c.txt", "c", 2_000_000_000)
+    assert watcher.poll(now=11) == []
+    touch(tmp_path / "a.txt", "aaa", 3_000_000_000)
+    assert watcher.poll(now=11.1) == []
+    assert watcher.poll(now=11.25) == [str(tmp_path / "c.txt")]
+    assert watcher.poll(now=11.3) == [str(tmp_path / "a.txt")]
+    assert watcher.poll(now=12) == []
+
+    (tmp_path / "a.txt").unlink()
+    assert watcher.poll(now=13) == []
+    assert list(watcher.known) == [str(tmp_path / "c.txt")]
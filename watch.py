@@ -0,0 +1,75 @@
+"""
+Polling-based watching of raw text files, so they can be re-tagged as soon as
+  they change.
+"""
+
+import time
+from pathlib import Path
+
+
+class Watcher:
+    """
+    Watch files (or files matching a glob pattern in directories) for changes,
+      by polling their modification times and sizes.
+
+    A change is only reported once the file has stopped changing for `debounce`
+      seconds, so that a burst of saves results in a single re-tagging.
+    """
+
+    def __init__(self, paths, pattern="*.txt", interval=0.1, debounce=0.2):
+        self.paths = [Path(path) for path in paths]
+        self.pattern = pattern
+        self.interval = interval
+        self.debounce = debounce
+        self.known = self.snapshot()
+        self.pending = {}
+
+    def snapshot(self):
+        """Modification time and size for each watched file."""
+        files = []
+        for path in self.paths:
+            files.extend(sorted(path.glob(self.pattern)) if path.is_dir() else [path])
+
+        signatures = {}
+        for path in files:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                # deleted between listing and stat
+                continue
+            signatures[str(path)] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def poll(self, now=None):
+        """Check for changes once, returning the files that are ready to re-tag."""
+        now = time.monotonic() if now is None else now
+        current = self.snapshot()
+
+        for path in set(self.known) - set(current):
+            del self.known[path]
+        for path in set(self.pending) - set(current):
+            del self.pending[path]
+
+        for path, signature in current.items():
+            if self.known.get(path) == signature:
+                self.pending.pop(path, None)
+            elif path not in self.pending or self.pending[path][0] != signature:
+                # new or still changing, so (re)start the debounce period
+                self.pending[path] = (signature, now)
+
+        ready = sorted(
+            path
+            for path, (signature, changed) in self.pending.items()
+            if now - changed >= self.debounce
+        )
+        for path in ready:
+            self.known[path] = self.pending.pop(path)[0]
+        return ready
+
+    def __iter__(self):
+        """Yield lists of changed files, indefinitely."""
+        while True:
+            ready = self.poll()
+            if ready:
+                yield ready
+            time.sleep(self.interval)